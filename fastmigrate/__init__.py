@@ -1,16 +1,31 @@
 "fastmigrate - Structured migration of data in SQLite databases."
 __version__ = "0.5.3"
 
+import importlib
+from typing import Any
 
-
-from fastmigrate.core import ( run_migrations, setup_logging, create_db, ensure_versioned_db, get_db_version, create_db_backup, create_database_backup,)
-
-# Optional: recreate_table depends on apswutils, which is not required for the
-# core migration runner.
-try: from fastmigrate.migrations import recreate_table
-except Exception:  # pragma: no cover
-    def recreate_table(*args, **kwargs):  # type: ignore
-        raise ImportError( "fastmigrate.recreate_table requires the optional 'apswutils' dependency")
+# Public names are resolved lazily (PEP 562), so importing the package (e.g.
+# from the CLI entry points) does not load sqlite3 or the migration runner.
+_LAZY = {"run_migrations": "fastmigrate.core", "setup_logging": "fastmigrate.core", "create_db": "fastmigrate.core",
+         "ensure_versioned_db": "fastmigrate.core", "get_db_version": "fastmigrate.core",
+         "create_db_backup": "fastmigrate.core", "create_database_backup": "fastmigrate.core",
+         "recreate_table": "fastmigrate.migrations"}
 
 __all__ = ["run_migrations", "setup_logging", "create_db", "get_db_version", "create_db_backup", "recreate_table",
            "ensure_versioned_db", "create_database_backup"]
+
+def __getattr__(name: str) -> Any:
+    "Import public name `name` from its module on first access (PEP 562)."
+    if name not in _LAZY: raise AttributeError(f"module 'fastmigrate' has no attribute {name!r}")
+    try: mod = importlib.import_module(_LAZY[name])
+    except ImportError:
+        if name != "recreate_table": raise
+        # Optional: recreate_table depends on apswutils, which is not required for the
+        # core migration runner.
+        def recreate_table(*args, **kwargs):  # type: ignore
+            raise ImportError( "fastmigrate.recreate_table requires the optional 'apswutils' dependency")
+        return recreate_table
+    value = globals()[name] = getattr(mod, name)
+    return value
+
+def __dir__() -> list[str]: return sorted(set(globals()) | set(__all__))
@@ -1,29 +1,81 @@
 """Command-line interface for fastmigrate.
 
 This module intentionally avoids any non-stdlib CLI frameworks so fastmigrate
-can run in minimal environments.
+can run in minimal environments. Heavier imports (``sqlite3``,
+``fastmigrate.core``) are deferred into the command bodies so that
+``--help`` stays fast.
 """
 
+from __future__ import annotations
+
 import argparse
+import functools
 import os
 import sys
-from pathlib import Path
-import sqlite3
-import configparser
-from importlib.metadata import version
-
-from fastmigrate import core
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import NoReturn, overload
 
 # Define constants - single source of truth for default values
-DEFAULT_DB = Path("data/database.db")
-DEFAULT_MIGRATIONS = Path("migrations")
-DEFAULT_CONFIG = Path(".fastmigrate")
+DEFAULT_DB = "data/database.db"
+DEFAULT_MIGRATIONS = "migrations"
+DEFAULT_CONFIG = ".fastmigrate"
+
+def _parse_paths_ini(text: str) -> dict[str, str]:
+    """Return the ``[paths]`` section of INI `text`.
 
+    A minimal reader covering what ``.fastmigrate`` uses: ``#``/``;`` comment
+    lines, and ``key = value`` or ``key: value`` pairs, with keys lowercased
+    as ``configparser`` does.
+    """
+    paths: dict[str, str] = {}
+    section = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line[0] in "#;": continue
+        if line[0] == "[" and line[-1] == "]":
+            section = line[1:-1]
+            continue
+        if section != "paths": continue
+        i = min((j for j in (line.find("="), line.find(":")) if j >= 0), default=-1)
+        if i > 0: paths[line[:i].strip().lower()] = line[i+1:].strip()
+    return paths
+
+@functools.lru_cache(maxsize=8)
+def _read_paths_cached(path: str, mtime_ns: int, size: int) -> Mapping[str, str]:
+    "Read-only view of the ``[paths]`` section of the config file at `path`, cached on the file's (path, mtime, size)."
+    with open(path) as f: return MappingProxyType(_parse_paths_ini(f.read()))
+
+def _load_paths(config_path: str) -> Mapping[str, str] | None:
+    "Return the ``[paths]`` config values, or None if the config file does not exist."
+    try: st = os.stat(config_path)
+    except OSError: return None
+    return _read_paths_cached(os.fspath(config_path), st.st_mtime_ns, st.st_size)
+
+def _parser(prog: str, description: str | None, **defaults: str) -> argparse.ArgumentParser:
+    "Build the parser for `prog`, with a string ``--<name>`` option for each of `defaults`."
+    parser = argparse.ArgumentParser(prog=prog, description=description)
+    for name, default in defaults.items(): parser.add_argument(f"--{name}", default=default, type=str)
+    return parser
+
+def _die(msg: str, code: int = 1) -> NoReturn:
+    "Print `msg` to stderr and exit with `code`."
+    print(msg, file=sys.stderr)
+    raise SystemExit(code)
+
+def _is_default(path: str, default: str) -> bool:
+    "Whether `path` names the same path as `default`, e.g. ``./data/database.db`` for ``data/database.db``."
+    return path == default or os.path.normpath(path) == default
+
+@overload
+def _get_config(config_path: str, db: str | os.PathLike[str], migrations: None) -> tuple[str, None]: ...
+@overload
+def _get_config(config_path: str, db: str | os.PathLike[str], migrations: str | os.PathLike[str]=...) -> tuple[str, str]: ...
 def _get_config(
-        config_path: Path,     # config file, which may not exist
-        db: Path,              # db file, which need not exist
-        migrations: Path=DEFAULT_MIGRATIONS # migrations dir, which may not exist
-    ) -> tuple[Path, Path]:
+        config_path: str, # config file, which may not exist
+        db: str | os.PathLike[str], # db file, which need not exist
+        migrations: str | os.PathLike[str] | None=DEFAULT_MIGRATIONS # migrations dir, which may not exist; None if unused
+    ) -> tuple[str, str | None]:
     """Performs final value resolution for db and migrations.
 
     CLI args > config file > default values.
@@ -39,23 +91,25 @@ def _get_config(
     (Consequently, there is no way for the user to explicitly specify
     a value which is equal to the default value, and to have that take
     precedence over a conflicting value in the config file!)
+
+    Commands that only use the db pass ``migrations=None``, so an explicit
+    db alone skips the config file (and None is returned for migrations).
     """
-    if config_path.exists():
-        cfg = configparser.ConfigParser()
-        cfg.read(config_path)
-        if "paths" in cfg:
-            # Only use config values if CLI values are defaults
-            if "db" in cfg["paths"] and db == DEFAULT_DB: db_path = Path(cfg["paths"]["db"])
-            else: db_path = db
-            if "migrations" in cfg["paths"] and migrations == DEFAULT_MIGRATIONS:
-                migrations_path = Path(cfg["paths"]["migrations"])
-            else: migrations_path = migrations
-    else: db_path,migrations_path = db,migrations
+    db_path = os.fspath(db)
+    migrations_path = None if migrations is None else os.fspath(migrations)
+    db_is_default = _is_default(db_path, DEFAULT_DB)
+    migrations_is_default = migrations_path is not None and _is_default(migrations_path, DEFAULT_MIGRATIONS)
+    # Nothing left for the config file to supply, so don't even stat it
+    if not db_is_default and not migrations_is_default: return db_path, migrations_path
+    paths = _load_paths(config_path) or {}
+    # Only use config values if CLI values are defaults
+    if db_is_default and "db" in paths: db_path = paths["db"]
+    if migrations_is_default and "migrations" in paths: migrations_path = paths["migrations"]
     return db_path, migrations_path
 
 def backup_db(
-    db: Path = DEFAULT_DB, # Path to the SQLite database file
-    config_path: Path = DEFAULT_CONFIG, # Path to config file
+    db: str = DEFAULT_DB, # Path to the SQLite database file
+    config_path: str = DEFAULT_CONFIG, # Path to config file
     argv: list[str] | None = None,
 ) -> None:
     """Create a backup of the SQLite database.
@@ -63,17 +117,16 @@ def backup_db(
     Note: command line arguments take precedence over values from a
     config file, unless they are equal to default values.
     """
-    parser = argparse.ArgumentParser(prog="fastmigrate_backup_db", description=backup_db.__doc__)
-    parser.add_argument("--db", default=db, type=Path)
-    parser.add_argument("--config_path", default=config_path, type=Path)
+    parser = _parser("fastmigrate_backup_db", backup_db.__doc__, db=db, config_path=config_path)
     args = parser.parse_args(argv)
 
-    db_path, _ = _get_config(args.config_path, args.db)
+    from fastmigrate import core
+    db_path, _ = _get_config(args.config_path, args.db, None)
     if core.create_db_backup(db_path) is None: sys.exit(1)
 
 def check_version(
-    db: Path = DEFAULT_DB, # Path to the SQLite database file
-    config_path: Path = DEFAULT_CONFIG, # Path to config file
+    db: str = DEFAULT_DB, # Path to the SQLite database file
+    config_path: str = DEFAULT_CONFIG, # Path to config file
     argv: list[str] | None = None,
 ) -> None:
     """Show the version of fastmigrate and the SQLite database.
@@ -81,26 +134,26 @@ def check_version(
     Note: command line arguments take precedence over values from a
     config file, unless they are equal to default values.
     """
-    parser = argparse.ArgumentParser(prog="fastmigrate_check_version", description=check_version.__doc__)
-    parser.add_argument("--db", default=db, type=Path)
-    parser.add_argument("--config_path", default=config_path, type=Path)
+    parser = _parser("fastmigrate_check_version", check_version.__doc__, db=db, config_path=config_path)
     args = parser.parse_args(argv)
 
-    print(f"FastMigrate version: {version('fastmigrate')}")
-    db_path, _ = _get_config(args.config_path, args.db)
-    if not db_path.exists():
-        print(f"Database file does not exist: {db_path}")
-        sys.exit(1)
+    import sqlite3
+    from fastmigrate import __version__, core
+    print(f"FastMigrate version: {__version__}")
+    db_path, _ = _get_config(args.config_path, args.db, None)
+    # get_db_version does its own existence check, so don't stat the file twice
     try:
         db_version = core.get_db_version(db_path)
         print(f"Database version: {db_version}")
+    except FileNotFoundError:
+        _die(f"Database file does not exist: {db_path}")
     except sqlite3.Error: print("Database is unversioned (no _meta table)")
     return
 
 
 def create_db(
-        db: Path = DEFAULT_DB, # Path to SQLite db file, which may not exist
-        config_path: Path = DEFAULT_CONFIG, # Path to config file
+        db: str = DEFAULT_DB, # Path to SQLite db file, which may not exist
+        config_path: str = DEFAULT_CONFIG, # Path to config file
         argv: list[str] | None = None,
 ) -> None:
     """Create a new SQLite database, with versioning build-in.
@@ -110,36 +163,33 @@ def create_db(
     Note: command line arguments take precedence over values from a
     config file, unless they are equal to default values.
     """
-    parser = argparse.ArgumentParser(prog="fastmigrate_create_db", description=create_db.__doc__)
-    parser.add_argument("--db", default=db, type=Path)
-    parser.add_argument("--config_path", default=config_path, type=Path)
+    parser = _parser("fastmigrate_create_db", create_db.__doc__, db=db, config_path=config_path)
     args = parser.parse_args(argv)
 
-    db_path, _ = _get_config(args.config_path, args.db)
+    import sqlite3
+    from fastmigrate import core
+    db_path, _ = _get_config(args.config_path, args.db, None)
     print(f"Creating database at {db_path}")
     try:
         # Check if file existed before we call create_db
-        file_existed_before = db_path.exists()
+        file_existed_before = os.path.exists(db_path)
         version = core.create_db(db_path)
-        if not db_path.exists():
-            print(f"Error: Expected database file to be created at {db_path}")
-            sys.exit(1)
+        if not os.path.exists(db_path):
+            _die(f"Error: Expected database file to be created at {db_path}")
 
         if not file_existed_before: print(f"Created new versioned SQLite database with version=0 at: {db_path}")
         else: print(f"A versioned database (version: {version}) already exists at: {db_path}")
 
         sys.exit(0)
     except sqlite3.Error as e:
-        print(f"An unversioned db already exists at {db_path}, or there was some other write error.\nError: {e}")
-        sys.exit(1)
+        _die(f"An unversioned db already exists at {db_path}, or there was some other write error.\nError: {e}")
     except Exception as e:
-        print(f"Unexpected error: {e}")
-        sys.exit(1)
+        _die(f"Unexpected error: {e}")
 
 def enroll_db(
-    db: Path = DEFAULT_DB, # Path to the SQLite database file
-    migrations: Path = DEFAULT_MIGRATIONS, # Path to the migrations directory
-    config_path: Path = DEFAULT_CONFIG, # Path to config file
+    db: str = DEFAULT_DB, # Path to the SQLite database file
+    migrations: str = DEFAULT_MIGRATIONS, # Path to the migrations directory
+    config_path: str = DEFAULT_CONFIG, # Path to config file
     argv: list[str] | None = None,
 ) -> None:
     """Enroll an existing SQLite database for versioning, and generate a draft initial migration.
@@ -147,20 +197,19 @@ def enroll_db(
     Note: command line arguments take precedence over values from a
     config file, unless they are equal to default values.
     """
-    parser = argparse.ArgumentParser(prog="fastmigrate_enroll_db", description=enroll_db.__doc__)
-    parser.add_argument("--db", default=db, type=Path)
-    parser.add_argument("--migrations", default=migrations, type=Path)
-    parser.add_argument("--config_path", default=config_path, type=Path)
+    parser = _parser("fastmigrate_enroll_db", enroll_db.__doc__, db=db, migrations=migrations, config_path=config_path)
     args = parser.parse_args(argv)
 
+    import sqlite3
+    from pathlib import Path
+    from fastmigrate import core
     db_path, migrations_path = _get_config(args.config_path, args.db, args.migrations)
     try:
         db_version = core.get_db_version(db_path)
-        print(f"Cannot enroll, since this database is already managed.\nIt is marked as version {db_version}")
-        sys.exit(1)
+        _die(f"Cannot enroll, since this database is already managed.\nIt is marked as version {db_version}")
     except sqlite3.Error: pass
-    if not migrations_path.exists(): migrations_path.mkdir(parents=True)
-    initial_migration = migrations_path / "0001-initialize.sql"
+    Path(migrations_path).mkdir(parents=True, exist_ok=True)
+    initial_migration = Path(migrations_path) / "0001-initialize.sql"
     schema = core.get_db_schema(db_path)
     initial_migration.write_text(schema)
     core._ensure_meta_table(db_path)
@@ -168,9 +217,9 @@ def enroll_db(
 
 
 def run_migrations(
-    db: Path = DEFAULT_DB, # Path to the SQLite database file
-    migrations: Path = DEFAULT_MIGRATIONS, # Path to the migrations directory
-    config_path: Path = DEFAULT_CONFIG, # Path to config file
+    db: str = DEFAULT_DB, # Path to the SQLite database file
+    migrations: str = DEFAULT_MIGRATIONS, # Path to the migrations directory
+    config_path: str = DEFAULT_CONFIG, # Path to config file
     verbose: bool = False, # Enable debug logging
     argv: list[str] | None = None,
 ) -> None:
@@ -179,13 +228,11 @@ def run_migrations(
     Note: command line arguments take precedence over values from a
     config file, unless they are equal to default values.
     """
-    parser = argparse.ArgumentParser(prog="fastmigrate_run_migrations", description=run_migrations.__doc__)
-    parser.add_argument("--db", default=db, type=Path)
-    parser.add_argument("--migrations", default=migrations, type=Path)
-    parser.add_argument("--config_path", default=config_path, type=Path)
+    parser = _parser("fastmigrate_run_migrations", run_migrations.__doc__, db=db, migrations=migrations, config_path=config_path)
     parser.add_argument("-v", "--verbose", action="store_true", default=verbose)
     args = parser.parse_args(argv)
 
+    from fastmigrate import core
     core.setup_logging(args.verbose)
     db_path, migrations_path = _get_config(args.config_path, args.db, args.migrations)
     success = core.run_migrations(db_path, migrations_path)
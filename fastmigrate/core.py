@@ -10,8 +10,8 @@ awaitable, fastmigrate will automatically await it.
 """
 
 import asyncio
+import bisect
 import hashlib
-import importlib.util
 import inspect
 import logging
 import os
@@ -21,13 +21,15 @@ import subprocess
 import sys
 import threading
 import warnings
+import weakref
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
 from io import StringIO
 from pathlib import Path
 from sys import stderr
 from types import ModuleType
-from typing import Any, Awaitable, Callable, Dict, Optional
+from typing import Any, Callable, Coroutine, Iterator, Optional
 
 
 
@@ -63,21 +65,42 @@ class _UserBackend:
     close_connection: Optional[Callable] = None
 
 
-def _load_user_backend(migrations_dir: Path) -> Optional[_UserBackend]:
-    "Load a user backend adapter from ``migrations_dir/config.py`` if present."
+# config.py path -> (mtime_ns, size, backend), so repeat runs skip re-executing an unchanged config.py
+_BACKEND_CACHE: dict[str, tuple[int, int, _UserBackend]] = {}
+_BACKEND_CACHE_LOCK = threading.Lock()
+
+def _load_user_backend(migrations_dir: Path, has_config: Optional[bool] = None) -> Optional[_UserBackend]:
+    """Load a user backend adapter from ``migrations_dir/config.py`` if present.
+
+    `has_config` may be passed when a directory scan already established
+    whether ``config.py`` exists, which saves a stat when it does not.
+    """
+    if has_config is False: return None
     migrations_dir = Path(migrations_dir)
-    assert migrations_dir.exists()
+    if has_config is None: assert migrations_dir.exists()
     config_path = migrations_dir / "config.py"
-    if not config_path.exists(): return None
+    try: st = config_path.stat()
+    except FileNotFoundError: return None
+
+    key = str(config_path)
+    with _BACKEND_CACHE_LOCK:
+        cached = _BACKEND_CACHE.get(key)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size): return cached[2]
+        backend = _import_user_backend(config_path)
+        _BACKEND_CACHE[key] = (st.st_mtime_ns, st.st_size, backend)
+    return backend
 
-    digest = hashlib.sha256(str(config_path).encode("utf-8")).hexdigest()[:12]
-    module_name = f"fastmigrate_user_config_{digest}"
 
-    spec = importlib.util.spec_from_file_location(module_name, config_path)
-    if spec is None or spec.loader is None: raise ImportError(f"Unable to import config.py from {config_path}")
+def _import_user_backend(config_path: Path) -> _UserBackend:
+    "Execute ``config_path`` as a module and validate its backend hooks."
+    digest = hashlib.blake2b(str(config_path).encode("utf-8"), digest_size=6).hexdigest()
+    module_name = f"fastmigrate_user_config_{digest}"
 
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
+    # Compile and exec directly; the importlib spec/loader machinery adds nothing for a single file
+    code = compile(config_path.read_bytes(), str(config_path), "exec")
+    module = ModuleType(module_name)
+    module.__file__ = str(config_path)
+    exec(code, module.__dict__)
 
     required = [ "get_connection", "ensure_meta_table", "get_version", "set_version", "execute_sql", ]
     missing = [name for name in required if not hasattr(module, name)]
@@ -99,29 +122,53 @@ async def _maybe_await(value: Any) -> Any:
     return value
 
 
-def _run_async_blocking(coro: Awaitable[Any]) -> Any:
+def _serve_loop(loop: asyncio.AbstractEventLoop) -> None:
+    "Run `loop` until stopped, then shut down its async generators and executor and close it."
+    asyncio.set_event_loop(loop)
+    try: loop.run_forever()
+    finally:
+        try:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.run_until_complete(loop.shutdown_default_executor())
+        finally: loop.close()
+
+
+class _BackgroundLoop:
+    "An event loop running in a daemon thread; stopped and closed once this handle is garbage collected."
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=_serve_loop, args=(self.loop,), name="fastmigrate-loop", daemon=True).start()
+        weakref.finalize(self, self.loop.call_soon_threadsafe, self.loop.stop)
+
+
+# One background loop per calling thread, released (and its loop shut down) when that thread exits
+_bg_local = threading.local()
+
+def _get_bg_loop() -> asyncio.AbstractEventLoop:
+    "Return the calling thread's persistent background event loop, starting it on first use."
+    bg = getattr(_bg_local, "bg", None)
+    if bg is None: bg = _bg_local.bg = _BackgroundLoop()
+    return bg.loop
+
+
+def _run_async_blocking(coro: Coroutine[Any, Any, Any]) -> Any:
     """Run an async coroutine from sync code.
 
-    If we're already inside an event loop, run the coroutine in a dedicated
-    thread to avoid "asyncio.run() cannot be called from a running event loop".
+    If we're already inside an event loop, submit the coroutine to a
+    persistent background loop to avoid "asyncio.run() cannot be called from
+    a running event loop", rather than starting a new thread and loop per call.
+    Each calling thread gets its own background loop, so callers on different
+    threads never queue behind each other. A re-entrant call (a backend hook
+    that itself runs migrations) comes from the background thread, and so gets
+    that thread's own nested loop instead of deadlocking on the one it blocks.
+    Loops are stopped and closed when the thread that owns them exits.
     """
     try: asyncio.get_running_loop()
     except RuntimeError: return asyncio.run(coro)
+    return asyncio.run_coroutine_threadsafe(coro, _get_bg_loop()).result()
 
-    result_box = {}
-    err_box = {}
-
-    def _runner() -> None:
-        try: result_box["result"] = asyncio.run(coro)
-        except BaseException as e: err_box["err"] = e
-
-    t = threading.Thread(target=_runner, daemon=True)
-    t.start()
-    t.join()
-    if "err" in err_box: raise err_box["err"]
-    return result_box.get("result")
-
-def create_db(db_path:Path) -> int:
+def create_db(db_path:Path | str) -> int:
     """Creates a versioned db, or ensures the existing db is versioned.
 
     If no db exists, creates an EMPTY db with version 0. (This is ready
@@ -132,21 +179,45 @@ def create_db(db_path:Path) -> int:
     If a db exists, without a version, raises an sqlite3.Error
     """
     db_path = Path(db_path)
-    if not db_path.exists():
+    if not os.path.exists(db_path):
         db_path.parent.mkdir(parents=True, exist_ok=True)
-        conn = sqlite3.connect(db_path)
-        conn.close()
+        db_path.touch()  # SQLite treats an empty file as a new database
         _ensure_meta_table(db_path)
         return 0
     else: return get_db_version(db_path)
 
 
+# Names of deprecated aliases that have already warned in this process
+_deprecation_emitted: set[str] = set()
+
+def _warn_deprecated_once(name: str, new_name: str) -> None:
+    "Emit the DeprecationWarning for alias `name` only on its first call."
+    if name in _deprecation_emitted: return
+    _deprecation_emitted.add(name)
+    warnings.warn(f"{name} is deprecated, as it has been renamed to {new_name}, which is functionally identical", DeprecationWarning, stacklevel=3)
+
 def ensure_versioned_db(db_path:Path) -> int:
     "See create_db"
-    warnings.warn("ensure_versioned_db is deprecated, as it has been renamed to create_db, which is functionally identical", DeprecationWarning, stacklevel=2)
+    _warn_deprecated_once("ensure_versioned_db", "create_db")
     return create_db(db_path)
 
-def _ensure_meta_table(db_path: Path) -> None:
+@contextmanager
+def _write_txn(conn: sqlite3.Connection) -> Iterator[None]:
+    """Run the block in a ``BEGIN IMMEDIATE`` transaction on `conn`.
+
+    Taking the write lock up front avoids a read-to-write lock upgrade that
+    can fail with SQLITE_BUSY. Commits on success, rolls back on error.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try: yield
+    except BaseException:
+        # SQLite may already have rolled back by itself (e.g. SQLITE_FULL); don't mask the error
+        if conn.in_transaction: conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _ensure_meta_table(db_path: Path | str, conn: sqlite3.Connection | None = None) -> None:
     """Create the _meta table if it doesn't exist, with a single row constraint.
 
     Uses a single-row pattern with a PRIMARY KEY on a constant value (1).
@@ -159,49 +230,42 @@ def _ensure_meta_table(db_path: Path) -> None:
 
     Args:
         db_path: Path to the SQLite database
+        conn: Open connection to `db_path` to reuse instead of opening one
 
     Raises:
         FileNotFoundError: If database file doesn't exist
         sqlite3.Error: If unable to read or write to the database
 
     """
-    db_path = Path(db_path)
-    if not db_path.exists(): raise FileNotFoundError(f"Database file does not exist: {db_path}")
+    own_conn = conn is None
+    if own_conn and not os.path.exists(db_path): raise FileNotFoundError(f"Database file does not exist: {db_path}")
 
-    conn = None
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.execute(
-            """
-            SELECT name, sql FROM sqlite_master
-            WHERE type='table' AND name='_meta'
-            """
-        )
-        row = cursor.fetchone()
-
-        if row is None:
-            try:
-                with conn:
-                    conn.execute(
-                        """
-                        CREATE TABLE _meta (
-                            id INTEGER PRIMARY KEY CHECK (id = 1),
-                            version INTEGER NOT NULL DEFAULT 0
-                        )
-                        """
+        if conn is None: conn = sqlite3.connect(db_path, isolation_level=None)
+        # Idempotent, so an existing _meta (and its version) is left untouched
+        try:
+            with _write_txn(conn):
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS _meta (
+                        id INTEGER PRIMARY KEY CHECK (id = 1),
+                        version INTEGER NOT NULL DEFAULT 0
                     )
-                    conn.execute("INSERT INTO _meta (id, version) VALUES (1, 0)")
-            except sqlite3.Error as e: raise sqlite3.Error(f"Failed to create _meta table: {e}")
+                    """
+                )
+                conn.execute("INSERT OR IGNORE INTO _meta (id, version) VALUES (1, 0)")
+        except sqlite3.Error as e: raise sqlite3.Error(f"Failed to create _meta table: {e}")
     except sqlite3.Error as e: raise sqlite3.Error(f"Failed to access database: {e}")
     finally:
-        if conn: conn.close()
+        if own_conn and conn: conn.close()
 
 
-def get_db_version(db_path: Path) -> int:
+def get_db_version(db_path: Path | str, conn: sqlite3.Connection | None = None) -> int:
     """Get the current database version.
 
     Args:
         db_path: Path to the SQLite database
+        conn: Open connection to `db_path` to reuse instead of opening one
 
     Returns:
         int: The current database version
@@ -210,12 +274,12 @@ def get_db_version(db_path: Path) -> int:
         FileNotFoundError: If database file doesn't exist
         sqlite3.Error: If unable to read the db version because it is not managed
     """
-    db_path = Path(db_path)
-    if not db_path.exists(): raise FileNotFoundError(f"Database file does not exist: {db_path}")
+    own_conn = conn is None
+    if own_conn and not os.path.exists(db_path): raise FileNotFoundError(f"Database file does not exist: {db_path}")
 
-    conn = None
     try:
-        conn = sqlite3.connect(db_path)
+        # Reading the version never writes, so open read-only
+        if conn is None: conn = sqlite3.connect(f"{Path(db_path).absolute().as_uri()}?mode=ro", uri=True)
         cursor = conn.execute("SELECT version FROM _meta WHERE id = 1")
         result = cursor.fetchone()
         if result is None: raise sqlite3.Error("No version found in _meta table")
@@ -223,96 +287,187 @@ def get_db_version(db_path: Path) -> int:
     except sqlite3.OperationalError: raise sqlite3.Error("_meta table does not exist")
     except sqlite3.Error as e: raise sqlite3.Error(f"Failed to get database version: {e}")
     finally:
-        if conn: conn.close()
+        if own_conn and conn: conn.close()
 
 
-def _set_db_version(db_path: Path, version: int) -> None:
+# Update the row in place; only insert it if it is missing. Unlike INSERT OR
+# REPLACE this never deletes and rewrites the existing row.
+_SET_VERSION_SQL = "UPDATE _meta SET version = ? WHERE id = 1"
+_INSERT_VERSION_SQL = "INSERT OR IGNORE INTO _meta (id, version) VALUES (1, ?)"
+
+def _write_version(conn: sqlite3.Connection, version: int) -> None:
+    "Record `version` in _meta on `conn`, within the caller's transaction."
+    if conn.execute(_SET_VERSION_SQL, (version,)).rowcount == 0: conn.execute(_INSERT_VERSION_SQL, (version,))
+
+def _set_db_version(db_path: Path | str, version: int, conn: sqlite3.Connection | None = None) -> None:
     """Set the database version.
 
-    Uses an UPSERT pattern (INSERT OR REPLACE) to ensure we always set the
-    version for id=1, even if the row doesn't exist yet.
+    Updates the version row for id=1 in place, inserting it if it doesn't
+    exist yet.
 
     Args:
         db_path: Path to the SQLite database
         version: The version number to set
+        conn: Open connection to `db_path` to reuse instead of opening one
 
     Raises:
         FileNotFoundError: If database file doesn't exist
         sqlite3.Error: If unable to write to the database
     """
-    db_path = Path(db_path)
-    if not db_path.exists(): raise FileNotFoundError(f"Database file does not exist: {db_path}") 
-    conn = None
+    own_conn = conn is None
+    if own_conn and not os.path.exists(db_path): raise FileNotFoundError(f"Database file does not exist: {db_path}")
     try:
-        conn = sqlite3.connect(db_path)
+        if conn is None: conn = sqlite3.connect(db_path, isolation_level=None)
         try:
-            with conn:
-                conn.execute(
-                    """
-                    INSERT OR REPLACE INTO _meta (id, version)
-                    VALUES (1, ?)
-                    """,
-                    (version,)
-                )
+            with _write_txn(conn):
+                _write_version(conn, version)
         except sqlite3.Error as e: raise sqlite3.Error(f"Failed to set version: {e}")
     except sqlite3.Error as e: raise sqlite3.Error(f"Failed to access database: {e}")
     finally:
-        if conn: conn.close()
+        if own_conn and conn: conn.close()
+
+_VERSION_RE = re.compile(r"^(\d{4})-.*\.(py|sql|sh)$")
 
 def extract_version_from_filename(filename: str) -> Optional[int]:
     "Extract the version number from a migration script filename."
-    filename = str(filename)
-    match = re.match(r"^(\d{4})-.*\.(py|sql|sh)$", filename)
+    match = _VERSION_RE.match(str(filename))
     if match: return int(match.group(1))
     return None
 
-def get_migration_scripts(migrations_dir: Path) -> Dict[int, Path]:
+def _scan_migrations_dir(migrations_dir: Path) -> Optional[tuple[bool, list[tuple[str, str]]]]:
+    """List the files in `migrations_dir` with a single ``scandir``.
+
+    Returns whether ``config.py`` is present and the ``(name, path)`` of every
+    file, or None if the directory does not exist.
+    """
+    # DirEntry.is_file() uses the type from the directory listing, so no per-file stat
+    try:
+        with os.scandir(migrations_dir) as entries:
+            files = [(e.name, e.path) for e in entries if e.is_file()]
+    except FileNotFoundError: return None
+    return any(name == "config.py" for name, _ in files), files
+
+
+def get_migration_scripts(migrations_dir: Path, files: Optional[list[tuple[str, str]]] = None) -> dict[int, Path]:
     """Get all valid migration scripts from the migrations directory.
 
     Returns a dictionary mapping version numbers to file paths.  Raises ValueError if two scripts have the same version number.
+    `files` may be passed from an earlier `_scan_migrations_dir` to avoid listing the directory again.
     """
-    migrations_dir = Path(migrations_dir)
-    migration_scripts = {}
-    if not migrations_dir.exists(): return migration_scripts
-
-    for file_path in [x for x in migrations_dir.iterdir() if x.is_file()]:
-        version = extract_version_from_filename(file_path.name)
+    migration_scripts: dict[int, Path] = {}
+    if files is None:
+        scan = _scan_migrations_dir(migrations_dir)
+        if scan is None: return migration_scripts
+        files = scan[1]
+    # Only build a Path for files that turn out to be migrations
+    for name, file_path in files:
+        version = extract_version_from_filename(name)
         if version is not None:
-            if version in migration_scripts:
+            path = Path(file_path)
+            # One dict probe: setdefault returns the earlier path on a duplicate
+            prev = migration_scripts.setdefault(version, path)
+            if prev is not path:
                 raise ValueError(
                     f"Duplicate migration version {version}: "
-                    f"{migration_scripts[version]} and {file_path}"
+                    f"{prev} and {path}"
                 )
-            migration_scripts[version] = file_path
     return migration_scripts
 
 
-def execute_sql_script(db_path: Path, script_path: Path) -> bool:
+_LEADING_COMMENTS_RE = re.compile(r"\A(?:\s+|--[^\n]*(?:\n|\Z)|/\*.*?(?:\*/|\Z))*", re.DOTALL)
+_KEYWORD_RE = re.compile(r"[A-Za-z]+")
+# Statements that can't run inside (or would break) a transaction opened around the script
+_TXN_CONTROL = {"BEGIN", "COMMIT", "END", "ROLLBACK", "SAVEPOINT", "RELEASE", "VACUUM", "PRAGMA", "ATTACH", "DETACH"}
+
+class _ManagesTransactions(Exception):
+    "Raised to abandon the transaction wrapping a script that has its own transaction control."
+
+# A ';', or a quoted string/identifier or comment (whose ';' never end a statement).
+# Every alternative matches once started, so finditer never backtracks: one linear pass.
+_SQL_SEMICOLON_RE = re.compile(r""";|'[^']*(?:'|\Z)|"[^"]*(?:"|\Z)|`[^`]*(?:`|\Z)|\[[^\]]*(?:\]|\Z)|--[^\n]*|/\*.*?(?:\*/|\Z)""", re.DOTALL)
+
+def _split_sql(script: str) -> Iterator[str]:
+    """Yield the statements in `script`, keeping ';' inside literals, comments and trigger bodies intact.
+
+    Statements are produced lazily, so scanning a large script never holds a
+    second full copy of it in memory. Literals and comments are skipped in a
+    single pass, so only a ';' that could end a statement is checked with
+    ``complete_statement`` (more than once per statement only in trigger bodies).
+    """
+    start = 0
+    for m in _SQL_SEMICOLON_RE.finditer(script):
+        if m.group() != ";" or not sqlite3.complete_statement(script[start:m.end()]): continue
+        yield script[start:m.end()]
+        start = m.end()
+    if script[start:].strip(): yield script[start:]
+
+def _first_keyword(stmt: str) -> str:
+    "Upper-cased first keyword of `stmt`, skipping leading comments."
+    m = _KEYWORD_RE.match(_LEADING_COMMENTS_RE.sub("", stmt, count=1))
+    return m.group(0).upper() if m else ""
+
+
+
+def execute_sql_script(db_path: Path, script_path: Path, conn: sqlite3.Connection | None = None, version: int | None = None) -> bool:
     """Execute a SQL script against the database.
 
+    If `version` is given it is recorded as the db version once the script
+    succeeds. The script's statements and the version update then run one by
+    one in a single transaction, so a failing script leaves neither applied.
+    A script with its own transaction control (see `_TXN_CONTROL`) is
+    detected on reaching that statement; the transaction is rolled back and
+    the script is rerun as written, with the version recorded afterwards.
+
     Args:
         db_path: Path to the SQLite database file
         script_path: Path to the SQL script file
+        conn: Open connection to `db_path` to reuse instead of opening one
+        version: Version to record after the script succeeds
 
     Returns:
         bool: True if the script executed successfully, False otherwise
     """
-    db_path = Path(db_path)
     script_path = Path(script_path)
-    conn = None
+    own_conn = conn is None
     try:
-        conn = sqlite3.connect(db_path)
-        script_content = script_path.read_text()
+        if conn is None: conn = sqlite3.connect(db_path, isolation_level=None)
+        script_content = script_path.read_bytes().decode()  # SQLite text is UTF-8; skip the locale-dependent text layer
+        if version is not None:
+            try:
+                with _write_txn(conn):
+                    for stmt in _split_sql(script_content):
+                        if _first_keyword(stmt) in _TXN_CONTROL: raise _ManagesTransactions
+                        conn.execute(stmt)
+                    _write_version(conn, version)
+                return True
+            except _ManagesTransactions: pass  # nothing was committed; run the script as written below
         conn.executescript(script_content)
+        if version is not None: _set_db_version(db_path, version, conn)
         return True
 
     except sqlite3.Error as e:
+        if conn is not None and conn.in_transaction: conn.rollback()
         print(f"Error executing SQL script {script_path}:", file=stderr)
         print(f"  {e}", file=stderr)
         return False
 
     finally:
-        if conn: conn.close()
+        if own_conn and conn: conn.close()
+
+
+def _write_stderr_bytes(data: bytes) -> None:
+    "Pass a script's captured stderr through as raw bytes, decoding only if stderr has no binary buffer."
+    buf = getattr(sys.stderr, "buffer", None)
+    if buf is None: sys.stderr.write(data.decode(errors="replace"))
+    else:
+        stderr.flush()  # keep ordering with the header already printed
+        buf.write(data)
+        buf.flush()
+
+
+def _script_stdout() -> Optional[int]:
+    "Let migration scripts print to our stdout when debug logging is on, else discard it."
+    return None if _logger.isEnabledFor(logging.DEBUG) else subprocess.DEVNULL
 
 
 def execute_python_script(db: Any, script_path: Path) -> bool:
@@ -326,11 +481,11 @@ def execute_python_script(db: Any, script_path: Path) -> bool:
     db_arg = str(db)
     script_path = Path(script_path)
     try:
-        subprocess.run( [sys.executable, script_path, db_arg], capture_output=True, check=True,)
+        subprocess.run( [sys.executable, script_path, db_arg], stdout=_script_stdout(), stderr=subprocess.PIPE, check=True,)
         return True
     except subprocess.CalledProcessError as e:
         print(f"Error executing Python script {script_path}:", file=stderr)
-        sys.stderr.write(e.stderr.decode())
+        _write_stderr_bytes(e.stderr)
         print("",file=stderr)
         return False
 
@@ -346,16 +501,20 @@ def execute_shell_script(db: Any, script_path: Path) -> bool:
     db_arg = str(db)
     script_path = Path(script_path)
     try:
-        subprocess.run( ["sh", script_path, db_arg], capture_output=True, check=True,)
+        subprocess.run( ["sh", script_path, db_arg], stdout=_script_stdout(), stderr=subprocess.PIPE, check=True,)
         return True
     except subprocess.CalledProcessError as e:
         print(f"Error executing shell script {script_path}:", file=stderr)
-        sys.stderr.write(e.stderr.decode())
+        _write_stderr_bytes(e.stderr)
         print("",file=stderr)
         return False
 
 
-def create_db_backup(db_path: Path) -> Path | None:
+# Migration scripts run as subprocesses, by extension (.sql is executed in-process)
+_SCRIPT_RUNNERS: dict[str, Callable[[Any, Path], bool]] = {".py": execute_python_script, ".sh": execute_shell_script}
+
+
+def create_db_backup(db_path: Path | str) -> Path | None:
     """Create a backup of the db, or returns None on failure.
 
     Uses the '.backup' SQLite command which ensures a consistent backup even if the
@@ -385,7 +544,7 @@ def create_db_backup(db_path: Path) -> Path | None:
         conn = sqlite3.connect(db_path)
         backup_conn = sqlite3.connect(backup_path)
 
-        with backup_conn: conn.backup(backup_conn)
+        conn.backup(backup_conn)  # pages=-1 (the default) copies everything in one step
 
         if not backup_path.exists(): raise Exception("Backup file was not created")
 
@@ -406,23 +565,29 @@ def create_db_backup(db_path: Path) -> Path | None:
 
 def create_database_backup(db_path:Path) -> Path | None:
     "See create_database_backup"
-    warnings.warn("create_database_backup is deprecated, as it has been renamed to create_db_backup, which is functionally identical", DeprecationWarning, stacklevel=2)
+    _warn_deprecated_once("create_database_backup", "create_db_backup")
     return create_db_backup(db_path)
 
 
-def execute_migration_script(db_path: Path, script_path: Path) -> bool:
-    "Execute a migration script based on its file extension."
+def execute_migration_script(db_path: Path, script_path: Path, conn: sqlite3.Connection | None = None, version: int | None = None) -> bool:
+    """Execute a migration script based on its file extension.
+
+    `conn` is reused for SQL scripts if given. If `version` is given it is
+    recorded as the db version once the script succeeds (see `execute_sql_script`).
+    """
     db_path = Path(db_path)
     script_path = Path(script_path)
-    ext = os.path.splitext(script_path)[1].lower()
+    ext = script_path.suffix.lower()
 
-    if ext == ".sql": return execute_sql_script(db_path, script_path)
-    elif ext == ".py": return execute_python_script(db_path, script_path)
-    elif ext == ".sh": return execute_shell_script(db_path, script_path)
-    else: return print(f"Unsupported script type: {script_path}", file=stderr)
+    if ext == ".sql": return execute_sql_script(db_path, script_path, conn, version)
+    runner = _SCRIPT_RUNNERS.get(ext)
+    if runner is None: return print(f"Unsupported script type: {script_path}", file=stderr)
+    success = runner(db_path, script_path)
+    if success and version is not None: _set_db_version(db_path, version, conn)
+    return success
 
 
-async def _run_migrations_with_backend_async( db: Any, migrations_dir: Path, backend: _UserBackend, verbose: bool = False,) -> bool:
+async def _run_migrations_with_backend_async( db: Any, migrations_dir: Path, backend: _UserBackend, verbose: bool = False, files: Optional[list[tuple[str, str]]] = None,) -> bool:
     """Run migrations using a user-provided backend adapter.
 
     This supports both sync and async hooks. All hooks are executed within a
@@ -434,9 +599,10 @@ async def _run_migrations_with_backend_async( db: Any, migrations_dir: Path, bac
 
     stats = {"applied": 0, "failed": 0}
 
-    try: migration_scripts = get_migration_scripts(migrations_dir)
+    try: migration_scripts = get_migration_scripts(migrations_dir, files)
     except ValueError as e: return print(f"Error: {e}", file=stderr)
-    _logger.debug(f"migration_versions={sorted(migration_scripts)}")
+    versions = sorted(migration_scripts)
+    _logger.debug(f"migration_versions={versions}")
 
     conn = await _maybe_await(backend.get_connection(db))
 
@@ -446,28 +612,27 @@ async def _run_migrations_with_backend_async( db: Any, migrations_dir: Path, bac
         current_version = int(await _maybe_await(backend.get_version(conn)))
         _logger.debug(f"current_version={current_version}")
 
-        pending_migrations = { version: path for version, path in migration_scripts.items() if version > current_version }
-        _logger.debug(f"pending_versions={sorted(pending_migrations)}")
+        # Sorted once; the pending migrations are the tail after current_version
+        sorted_versions = versions[bisect.bisect_right(versions, current_version):]
+        _logger.debug(f"pending_versions={sorted_versions}")
 
-        if not pending_migrations:
+        if not sorted_versions:
             _logger.debug(f"result=up_to_date current_version={current_version}")
             return True
 
-        sorted_versions = sorted(pending_migrations.keys())
-
         for version in sorted_versions:
-            script_path = Path(pending_migrations[version])
+            script_path = migration_scripts[version]
             script_name = script_path.name
             _logger.debug(f"apply version={version} script={script_name}")
 
-            ext = os.path.splitext(script_name)[1].lower()
+            ext = script_path.suffix.lower()
+            runner = _SCRIPT_RUNNERS.get(ext)
 
             if ext == ".sql":
-                sql = script_path.read_text()
+                sql = script_path.read_bytes().decode()
                 result = await _maybe_await(backend.execute_sql(conn, sql))
                 success = True if result is None else bool(result)
-            elif ext == ".py": success = execute_python_script(db, script_path)
-            elif ext == ".sh": success = execute_shell_script(db, script_path)
+            elif runner is not None: success = runner(db, script_path)
             else:
                 print(f"Unsupported script type: {script_path}", file=stderr)
                 success = False
@@ -495,7 +660,7 @@ async def _run_migrations_with_backend_async( db: Any, migrations_dir: Path, bac
         if backend.close_connection is not None: await _maybe_await(backend.close_connection(conn))
 
 
-def run_migrations( db_path: Any, migrations_dir: Path, verbose: bool = False,) -> bool:
+def run_migrations( db_path: Any, migrations_dir: Path | str, verbose: bool = False,) -> bool:
     """Run all pending migrations.
 
     By default, fastmigrate operates on SQLite database files.
@@ -515,25 +680,34 @@ def run_migrations( db_path: Any, migrations_dir: Path, verbose: bool = False,)
     """
     if verbose: setup_logging(True)
     migrations_dir = Path(migrations_dir)
-    backend = _load_user_backend(migrations_dir)
+    # One directory listing serves both the config.py check and the script lookup
+    scan = _scan_migrations_dir(migrations_dir)
+    has_config, files = (None, None) if scan is None else scan
+    backend = _load_user_backend(migrations_dir, has_config)
     if backend is not None:
         _logger.debug(f"db_exists={_debug_db_exists(db_path)}")
-        return bool( _run_async_blocking( _run_migrations_with_backend_async(db_path, migrations_dir, backend, verbose)))
+        return bool( _run_async_blocking( _run_migrations_with_backend_async(db_path, migrations_dir, backend, verbose, files)))
 
     db_path = Path(db_path)
     _logger.debug(f"mode=sqlite db={db_path} migrations_dir={migrations_dir}")
     stats = { "applied": 0, "failed": 0 }
 
-    db_exists = db_path.exists()
+    db_exists = os.path.exists(db_path)
     _logger.debug(f"db_exists={db_exists}")
     if not db_exists:
         print(f"Error: Database file does not exist: {db_path}", file=stderr)
         print("The database file must exist before running migrations.",file=stderr)
         return False
 
-    try: create_db(db_path)
-    except sqlite3.Error as e:
-        print(f"""Error: Cannot migrate the db at {db_path}.
+    # One connection for the whole run, rather than one per helper call
+    conn: sqlite3.Connection | None = None
+    try:
+        # The path exists, so it is managed iff it opens as a db and its version can be read
+        try:
+            conn = sqlite3.connect(db_path, isolation_level=None)
+            current_version = get_db_version(db_path, conn)
+        except sqlite3.Error:
+            print(f"""Error: Cannot migrate the db at {db_path}.
 
 This is because it is not managed by fastmigrate. Please do one of the following:
 
@@ -542,47 +716,44 @@ This is because it is not managed by fastmigrate. Please do one of the following
 
 2. Enroll your existing database, as described in
 https://answerdotai.github.io/fastmigrate/enrolling.html""",file=stderr)
-        return False
-
-    current_version = get_db_version(db_path)
-    _logger.debug(f"current_version={current_version}")
-    migration_scripts = get_migration_scripts(migrations_dir)
-
-    _logger.debug(f"migration_versions={sorted(migration_scripts)}")
-
-    pending_migrations = { version: path for version, path in migration_scripts.items() if version > current_version }
-    _logger.debug(f"pending_versions={sorted(pending_migrations)}")
-
-    if not pending_migrations:
-        _logger.debug(f"result=up_to_date current_version={current_version}")
-        return True
+            return False
+        _logger.debug(f"current_version={current_version}")
+        migration_scripts = get_migration_scripts(migrations_dir, files)
+        versions = sorted(migration_scripts)
+        _logger.debug(f"migration_versions={versions}")
 
-    sorted_versions = sorted(pending_migrations.keys())
+        # Sorted once; the pending migrations are the tail after current_version
+        sorted_versions = versions[bisect.bisect_right(versions, current_version):]
+        _logger.debug(f"pending_versions={sorted_versions}")
 
-    for version in sorted_versions:
-        script_path = pending_migrations[version]
-        script_name = script_path.name
-        _logger.debug(f"apply version={version} script={script_name}")
+        if not sorted_versions:
+            _logger.debug(f"result=up_to_date current_version={current_version}")
+            return True
 
+        for version in sorted_versions:
+            script_path = migration_scripts[version]
+            script_name = script_path.name
+            _logger.debug(f"apply version={version} script={script_name}")
 
-        success = execute_migration_script(db_path, script_path)
+            success = execute_migration_script(db_path, script_path, conn, version)
 
-        if not success:
-            stats["failed"] += 1
-            print(f"""Migration failed: {script_path}
+            if not success:
+                stats["failed"] += 1
+                print(f"""Migration failed: {script_path}
   • {stats['applied']} migrations applied
   • {stats['failed']} migrations failed""", file=stderr)
-            return False
+                return False
 
-        stats["applied"] += 1
+            stats["applied"] += 1
+            _logger.debug(f"updated_version={version}")
 
-        _set_db_version(db_path, version)
-        _logger.debug(f"updated_version={version}")
+        _logger.debug(f"result=success applied={stats['applied']} final_version={sorted_versions[-1]}")
+        return True
+    finally:
+        if conn is not None: conn.close()
 
-    _logger.debug(f"result=success applied={stats['applied']} final_version={sorted_versions[-1]}")
-    return True
 
-def get_db_schema(db_path: Path) -> str:
+def get_db_schema(db_path: Path | str) -> str:
     """Get the SQL schema of a SQLite database file.
 
     This function retrieves the CREATE statements for all tables,
@@ -1,5 +1,5 @@
 from pathlib import Path
-from apswutils import Database, Table  # type: ignore
+from apswutils import Database  # type: ignore
 
 def recreate_table(db_path:Path,         # db path
                    table_name:str,      # name of table to update by re-creating
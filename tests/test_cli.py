@@ -469,7 +469,7 @@ def test_check_db_version_option(tmp_path):
     ], capture_output=True, text=True)
 
     assert result.returncode == 1
-    assert "does not exist" in result.stdout
+    assert "does not exist" in result.stderr
 
 
 def test_cli_with_testsuite_a(tmp_path):
@@ -508,3 +508,69 @@ def test_cli_with_testsuite_a(tmp_path):
         assert cursor.fetchone() is not None
 
     conn.close()
+
+
+def test_cli_import_is_lazy():
+    """Test that importing the CLI module does not load fastmigrate.core or sqlite3."""
+    code = "import sys, fastmigrate.cli; print('fastmigrate.core' in sys.modules, 'sqlite3' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.returncode == 0
+    assert result.stdout.strip() == "False False"
+
+
+def test_get_config_reloads_changed_file(tmp_path):
+    """Test that the cached config is re-read when the config file changes."""
+    from fastmigrate.cli import _get_config, DEFAULT_DB
+    config_path = tmp_path / ".fastmigrate"
+    config_path.write_text("[paths]\ndb = first.db\n")
+    assert _get_config(config_path, DEFAULT_DB)[0] == "first.db"
+    config_path.write_text("[paths]\ndb = second_longer.db\n")
+    assert _get_config(config_path, DEFAULT_DB)[0] == "second_longer.db"
+
+
+def test_get_config_without_config_file_skips_parsing(tmp_path, monkeypatch):
+    """Test that the config parser is never called when no config file exists."""
+    from fastmigrate import cli
+    def fail(*args): raise AssertionError("missing config file should not be parsed")
+    monkeypatch.setattr(cli, "_read_paths_cached", fail)
+    assert cli._get_config(tmp_path / "missing", cli.DEFAULT_DB) == (cli.DEFAULT_DB, cli.DEFAULT_MIGRATIONS)
+
+
+def test_parse_paths_ini():
+    """Test the minimal INI reader used for the config file."""
+    from fastmigrate.cli import _parse_paths_ini
+    text = "# comment\n[other]\ndb = wrong.db\n\n[paths]\n; another comment\nDB = my.db\nmigrations: my_migrations\n"
+    assert _parse_paths_ini(text) == {"db": "my.db", "migrations": "my_migrations"}
+    assert _parse_paths_ini("[other]\ndb = x.db\n") == {}
+
+
+def test_get_config_without_paths_section(tmp_path):
+    """Test that a config file without a [paths] section falls back to the given values."""
+    from fastmigrate.cli import _get_config, DEFAULT_DB, DEFAULT_MIGRATIONS
+    config_path = tmp_path / ".fastmigrate"
+    config_path.write_text("[other]\ndb = ignored.db\n")
+    assert _get_config(config_path, DEFAULT_DB) == (DEFAULT_DB, DEFAULT_MIGRATIONS)
+    assert _get_config(config_path, "my.db", "my_migrations") == ("my.db", "my_migrations")
+
+
+def test_get_config_normalises_default_paths(tmp_path):
+    """Test that spellings of the default paths (./, //, Path) still defer to the config file."""
+    from fastmigrate.cli import _get_config, DEFAULT_DB
+    config_path = tmp_path / ".fastmigrate"
+    config_path.write_text("[paths]\ndb = configured.db\nmigrations = configured_migrations\n")
+    for db, migrations in [("./data/database.db", "./migrations"), ("data//database.db", "migrations/"),
+                           (Path(DEFAULT_DB), Path("migrations"))]:
+        assert _get_config(config_path, db, migrations) == ("configured.db", "configured_migrations")
+    assert _get_config(config_path, "./other.db", "other") == ("./other.db", "other")
+
+
+def test_get_config_db_only_skips_config_file(tmp_path, monkeypatch):
+    """Test that single-path commands (migrations=None) skip the config file when db is explicit."""
+    from fastmigrate import cli
+    config_path = tmp_path / ".fastmigrate"
+    config_path.write_text("[paths]\ndb = configured.db\n")
+    assert cli._get_config(config_path, cli.DEFAULT_DB, None) == ("configured.db", None)
+
+    def fail(path): raise AssertionError("config file should not be read")
+    monkeypatch.setattr(cli, "_load_paths", fail)
+    assert cli._get_config(config_path, "explicit.db", None) == ("explicit.db", None)
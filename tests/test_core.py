@@ -59,6 +59,12 @@ def test_ensure_meta_table(tmp_path):
 
     conn.close()
 
+    # Calling it again leaves the existing table and version untouched
+    _ensure_meta_table(db_path)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT id, version FROM _meta").fetchall() == [(1, 42)]
+    conn.close()
+
     # Test with invalid path to verify exception is raised
     with pytest.raises(FileNotFoundError):
         _ensure_meta_table(Path("/nonexistent/path/to/db.db"))
@@ -84,7 +90,13 @@ def test_get_set_db_version(tmp_path):  # Tests the internal _set_db_version fun
     conn = sqlite3.connect(db_path)
     cursor = conn.execute("SELECT id FROM _meta")
     assert cursor.fetchone()[0] == 1
+
+    # A missing version row is inserted rather than silently not updated
+    conn.execute("DELETE FROM _meta")
+    conn.commit()
     conn.close()
+    _set_db_version(db_path, 7)
+    assert get_db_version(db_path) == 7
     # Test with nonexistent database to verify exceptions
     with pytest.raises(FileNotFoundError):
         get_db_version(Path("/nonexistent/path/to/db.db"))
@@ -226,3 +238,53 @@ def test_run_migrations_on_unversioned_db(tmp_path):
     assert cursor.fetchone() is None, "run_migrations should not have created a _meta table"
 
     conn.close()
+
+
+def test_run_migrations_on_path_that_is_not_a_db(tmp_path, monkeypatch):
+    """Test that run_migrations reports an unopenable db path (e.g. a directory) instead of raising."""
+    migrations_dir = tmp_path / "migrations"
+    os.makedirs(migrations_dir)
+    with open(migrations_dir / "0001-create-table.sql", "w") as f:
+        f.write("CREATE TABLE test (id INTEGER PRIMARY KEY);")
+    db_path = tmp_path / "not_a_db"
+    db_path.mkdir()
+    import io
+    from fastmigrate import core
+    monkeypatch.setattr(core, "stderr", io.StringIO())
+
+    assert run_migrations(db_path, migrations_dir) is False
+    assert "not managed by fastmigrate" in core.stderr.getvalue()
+
+
+def test_deprecated_alias_warns_once(tmp_path, monkeypatch):
+    """Test that a deprecated alias only warns on its first call."""
+    import warnings
+    from fastmigrate import core
+    monkeypatch.setattr(core, "_deprecation_emitted", set())
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        assert core.ensure_versioned_db(tmp_path / "a.db") == 0
+        assert core.ensure_versioned_db(tmp_path / "b.db") == 0
+    assert [w.category for w in caught] == [DeprecationWarning]
+    assert caught[0].filename == __file__
+
+
+def test_split_sql():
+    """Test that SQL scripts are split only on statement-ending semicolons."""
+    from fastmigrate.core import _split_sql
+    script = (
+        "CREATE TABLE t (a, \"b;\", [c;], `d;`);\n"
+        "INSERT INTO t VALUES ('it''s; fine', 1, 2, 3); -- trailing; comment\n"
+        "CREATE TRIGGER tr AFTER INSERT ON t BEGIN UPDATE t SET a = 'x;y'; DELETE FROM t; END;\n"
+        "/* block; comment */ SELECT 1;\n"
+        "SELECT 2 /* unterminated; comment"
+    )
+    assert list(_split_sql(script)) == [
+        "CREATE TABLE t (a, \"b;\", [c;], `d;`);",
+        "\nINSERT INTO t VALUES ('it''s; fine', 1, 2, 3);",
+        " -- trailing; comment\nCREATE TRIGGER tr AFTER INSERT ON t BEGIN UPDATE t SET a = 'x;y'; DELETE FROM t; END;",
+        "\n/* block; comment */ SELECT 1;",
+        "\nSELECT 2 /* unterminated; comment",
+    ]
+    # Semicolons inside one literal don't each trigger a rescan of the statement
+    assert len(list(_split_sql("INSERT INTO t VALUES ('" + ";" * 100_000 + "');"))) == 1
@@ -188,3 +188,98 @@ def test_custom_config_with_duckdb_async(tmp_path: Path) -> None:
         assert things == [(1, "hello")]
     finally:
         conn.close()
+
+
+def test_user_backend_is_cached_until_config_changes(tmp_path: Path) -> None:
+    from fastmigrate.core import _load_user_backend
+
+    migrations_dir = tmp_path / "migrations"
+    migrations_dir.mkdir()
+    hooks = textwrap.dedent(
+        """
+        def get_connection(db): return db
+        def ensure_meta_table(conn): pass
+        def get_version(conn): return 0
+        def set_version(conn, version): pass
+        def execute_sql(conn, sql): pass
+        """
+    )
+    (migrations_dir / "config.py").write_text(hooks)
+
+    first = _load_user_backend(migrations_dir)
+    assert first is not None
+    assert _load_user_backend(migrations_dir) is first
+
+    (migrations_dir / "config.py").write_text(hooks + "\nCHANGED = True\n")
+    second = _load_user_backend(migrations_dir)
+    assert second is not None and second is not first
+    assert second.module.CHANGED is True
+
+
+def test_run_migrations_from_running_event_loop(tmp_path: Path) -> None:
+    import asyncio
+
+    migrations_dir = tmp_path / "migrations"
+    migrations_dir.mkdir()
+    db_path = tmp_path / "test.db"
+    (migrations_dir / "config.py").write_text(
+        textwrap.dedent(
+            """
+            import sqlite3
+
+            async def get_connection(db): return sqlite3.connect(db, isolation_level=None)
+            async def close_connection(conn): conn.close()
+            async def ensure_meta_table(conn):
+                conn.execute("CREATE TABLE IF NOT EXISTS _meta (id INTEGER PRIMARY KEY, version INTEGER NOT NULL)")
+                conn.execute("INSERT OR IGNORE INTO _meta VALUES (1, 0)")
+            async def get_version(conn): return conn.execute("SELECT version FROM _meta WHERE id=1").fetchone()[0]
+            async def set_version(conn, version): conn.execute("UPDATE _meta SET version=? WHERE id=1", (version,))
+            async def execute_sql(conn, sql): conn.executescript(sql)
+            """
+        )
+    )
+    (migrations_dir / "0001-create-things.sql").write_text("CREATE TABLE things (id INTEGER);")
+
+    async def main() -> bool: return run_migrations(db_path, migrations_dir)
+
+    assert asyncio.run(main()) is True
+    assert asyncio.run(main()) is True
+
+    conn = sqlite3.connect(db_path)
+    try: assert conn.execute("SELECT version FROM _meta WHERE id=1").fetchone()[0] == 1
+    finally: conn.close()
+
+
+def test_run_async_blocking_reentrant_call_does_not_deadlock() -> None:
+    import asyncio
+    import threading
+    from fastmigrate.core import _run_async_blocking
+
+    async def inner() -> int: return 1
+    async def outer() -> int: return _run_async_blocking(inner()) + 1  # sync hook re-entering from the background loop
+    async def main() -> int: return _run_async_blocking(outer())
+
+    result: list[int] = []
+    t = threading.Thread(target=lambda: result.append(asyncio.run(main())), daemon=True)
+    t.start()
+    t.join(timeout=10)
+    assert not t.is_alive() and result == [2]
+
+
+def test_background_loop_closed_when_calling_thread_exits() -> None:
+    import asyncio
+    import gc
+    import threading
+    import time
+    from fastmigrate.core import _get_bg_loop
+
+    loops: list[asyncio.AbstractEventLoop] = []
+    async def main() -> None: loops.append(_get_bg_loop())
+    t = threading.Thread(target=lambda: asyncio.run(main()))
+    t.start()
+    t.join()
+    gc.collect()
+
+    deadline = time.monotonic() + 5
+    while not loops[0].is_closed() and time.monotonic() < deadline: time.sleep(0.01)
+    assert loops[0].is_closed()
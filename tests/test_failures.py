@@ -223,3 +223,20 @@ def test_testsuite_failure_cli(tmp_path):
             f"Wrong version for {migration['file']}"
 
         conn.close()
+
+
+def test_script_stderr_passed_through_as_bytes(tmp_path, capfd):
+    """Test that a failing script's stderr is shown even if it isn't valid UTF-8."""
+    db_path = tmp_path / "test.db"
+    migrations_dir = tmp_path / "migrations"
+    migrations_dir.mkdir()
+    sqlite3.connect(db_path).close()
+    _ensure_meta_table(db_path)
+
+    (migrations_dir / "0001-fail.py").write_text(
+        "import sys\nsys.stderr.buffer.write(b'bad \\xff byte\\n')\nsys.exit(1)\n"
+    )
+
+    assert run_migrations(db_path, migrations_dir) is False
+    err = capfd.readouterr().err
+    assert "bad" in err and "byte" in err
@@ -117,3 +117,116 @@ def test_migration_failure(tmp_path):
     assert cursor.fetchone()[0] == "admin"
 
     conn.close()
+
+
+def test_failed_sql_migration_is_rolled_back(tmp_path):
+    """Test that a plain SQL migration and its version bump are applied atomically."""
+    db_path = tmp_path / "test.db"
+    migrations_dir = tmp_path / "migrations"
+    migrations_dir.mkdir()
+    sqlite3.connect(db_path).close()
+    _ensure_meta_table(str(db_path))
+
+    with open(migrations_dir / "0001-partial.sql", "w") as f:
+        f.write("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY);
+        INSERT INTO users (id) VALUES (1);
+        INSERT INTO no_such_table VALUES (1);
+        """)
+
+    assert run_migrations(str(db_path), str(migrations_dir)) is False
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT version FROM _meta WHERE id = 1").fetchone()[0] == 0
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name='users'").fetchone() is None
+    conn.close()
+
+
+def test_sql_migration_with_own_transaction(tmp_path):
+    """Test that SQL migrations managing their own transactions still run."""
+    db_path = tmp_path / "test.db"
+    migrations_dir = tmp_path / "migrations"
+    migrations_dir.mkdir()
+    sqlite3.connect(db_path).close()
+    _ensure_meta_table(str(db_path))
+
+    with open(migrations_dir / "0001-own-transaction.sql", "w") as f:
+        f.write("""
+        PRAGMA foreign_keys=OFF;
+        /* explicit transaction */ BEGIN TRANSACTION;
+        CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TRIGGER users_ai AFTER INSERT ON users BEGIN
+            UPDATE users SET name = 'a;b' WHERE id = NEW.id;
+        END;
+        INSERT INTO users (id) VALUES (1);
+        COMMIT;
+        """)
+
+    assert run_migrations(str(db_path), str(migrations_dir)) is True
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT version FROM _meta WHERE id = 1").fetchone()[0] == 1
+    assert conn.execute("SELECT name FROM users").fetchone()[0] == "a;b"
+    conn.close()
+
+
+def test_sql_migration_with_attach(tmp_path):
+    """Test that SQL migrations using ATTACH/DETACH, which can't run inside a transaction, still run."""
+    db_path = tmp_path / "test.db"
+    aux_path = tmp_path / "aux.db"
+    migrations_dir = tmp_path / "migrations"
+    migrations_dir.mkdir()
+    sqlite3.connect(db_path).close()
+    _ensure_meta_table(str(db_path))
+
+    with open(migrations_dir / "0001-attach.sql", "w") as f:
+        f.write(f"""
+        ATTACH DATABASE '{aux_path}' AS aux;
+        CREATE TABLE aux.things (id INTEGER PRIMARY KEY);
+        CREATE TABLE users (id INTEGER PRIMARY KEY);
+        DETACH DATABASE aux;
+        """)
+
+    assert run_migrations(str(db_path), str(migrations_dir)) is True
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT version FROM _meta WHERE id = 1").fetchone()[0] == 1
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name='users'").fetchone() is not None
+    conn.close()
+    conn = sqlite3.connect(aux_path)
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name='things'").fetchone() is not None
+    conn.close()
+
+
+def test_sql_migration_ending_in_unterminated_comment(tmp_path):
+    """Test that a script ending in an unterminated block comment (valid in SQLite) is applied and versioned."""
+    db_path = tmp_path / "test.db"
+    migrations_dir = tmp_path / "migrations"
+    migrations_dir.mkdir()
+    sqlite3.connect(db_path).close()
+    _ensure_meta_table(str(db_path))
+
+    with open(migrations_dir / "0001-comment.sql", "w") as f:
+        f.write("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY);
+        /* trailing comment that is never closed
+        """)
+
+    assert run_migrations(str(db_path), str(migrations_dir)) is True
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT version FROM _meta WHERE id = 1").fetchone()[0] == 1
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name='users'").fetchone() is not None
+    conn.close()
+
+
+def test_write_txn_keeps_error_when_already_rolled_back(tmp_path):
+    """Test that _write_txn re-raises the original error if the transaction is already gone."""
+    from fastmigrate.core import _write_txn
+    conn = sqlite3.connect(tmp_path / "test.db", isolation_level=None)
+    with pytest.raises(ValueError, match="original"):
+        with _write_txn(conn):
+            conn.execute("ROLLBACK")  # as SQLite does by itself on e.g. SQLITE_FULL
+            raise ValueError("original")
+    assert not conn.in_transaction
+    conn.close()